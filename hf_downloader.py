@@ -7,6 +7,7 @@ HuggingFace 下载工具
 
 import os
 import sys
+import random
 import requests
 import threading
 import time
@@ -16,8 +17,101 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import re
 import json
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 from bs4 import BeautifulSoup
 
+CHUNK_SIZE = 256 * 1024  # 单连接下载的读取块大小
+BATCH_WORKERS = 4        # 批量下载时并行下载的文件数
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# HuggingFace URL 格式（镜像与官方域名、目录与单文件合并为一个模式，模块加载时编译一次）
+# 目录: https://hf-mirror.com/username/model/tree/main/subdir
+# 单文件: https://hf-mirror.com/username/model/resolve|blob/main/file.bin
+_HF_RE = re.compile(r'(?:hf-mirror\.com|huggingface\.co)/(?P<username>[^/]+)/(?P<model>[^/]+)/'
+                    r'(?:tree/(?P<tree_branch>[^/]+)(?:/(?P<subpath>.*))?'
+                    r'|(?:resolve|blob)/(?P<branch>[^/]+)/(?P<filepath>.+))')
+
+# 大文件多连接分段下载参数
+RANGED_MIN_SIZE = 64 * 1024 * 1024  # 超过该大小才分段
+RANGED_PARTS = 4                    # 并发连接数
+RANGED_CHUNK_SIZE = 1024 * 1024     # 分段读取块大小
+PART_SUFFIX = '.part'               # 分段进度文件后缀
+
+# 直接读取 response.raw 时 urllib3 的异常不会被 requests 转换，需要一并捕获
+NETWORK_ERRORS = (requests.exceptions.ConnectionError,
+                  requests.exceptions.Timeout,
+                  requests.exceptions.ChunkedEncodingError,
+                  ProtocolError,
+                  ReadTimeoutError)
+
+
+def _retry_delay(retry_count):
+    """重试等待时间：指数退避加随机抖动，最长约 30 秒"""
+    return min(30.0, 2 ** retry_count) + random.random()
+
+
+def _response_total(response, offset=0):
+    """从响应头获取文件总大小：优先取 Content-Range 中的总长度，其次 Content-Length"""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    content_length = response.headers.get('Content-Length', '')
+    if content_length.isdigit():
+        return int(content_length) + (offset if response.status_code == 206 else 0)
+    return 0
+
+
+def _iter_response(response, chunk_size=CHUNK_SIZE):
+    """
+    逐块读取响应体。未压缩时用 readinto 读入同一个缓冲区，不为每块分配新的 bytes
+    注意：产出的是缓冲区的视图，调用方必须在取下一块之前用完
+    """
+    if response.headers.get('Content-Encoding', 'identity') != 'identity':
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    view = memoryview(bytearray(chunk_size))
+    while True:
+        n = response.raw.readinto(view)
+        if not n:
+            break
+        yield view[:n]
+
+
+class _BatchProgress:
+    """汇总多个并行下载的进度，节流后统一回调"""
+    
+    def __init__(self, total, callback):
+        self.total = total
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._per_file = {}
+        self._downloaded = 0
+        self._last_time = time.monotonic()
+        self._last_downloaded = 0
+    
+    def update(self, path, downloaded, total, speed, percentage):
+        """单个文件的进度回调，签名与 download_file 的 progress_callback 一致"""
+        with self._lock:
+            self._downloaded += downloaded - self._per_file.get(path, 0)
+            self._per_file[path] = downloaded
+            current_time = time.monotonic()
+            elapsed = current_time - self._last_time
+            # 每0.5秒更新一次；全部完成时无论间隔多短都要回调，保证进度停在 100%
+            finished = self.total > 0 and self._downloaded >= self.total
+            if elapsed < 0.5 and not finished:
+                return
+            speed = (self._downloaded - self._last_downloaded) / elapsed if elapsed > 0 else 0
+            self._last_time = current_time
+            self._last_downloaded = self._downloaded
+            done = self._downloaded
+        percentage = min(100.0, done / self.total * 100) if self.total > 0 else 0
+        # 在锁外回调，不让界面更新阻塞其他下载线程（回调需自行切换到界面线程）
+        self.callback(done, self.total, max(0, speed), percentage)
+
 
 class HFDownloader:
     """HuggingFace 文件下载器，支持断点续传"""
@@ -27,6 +121,16 @@ class HFDownloader:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # 复用连接池：批量下载的小文件和分段下载的各连接都不必重新进行 TLS 握手
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=RANGED_PARTS * 4,
+            max_retries=Retry(total=5, backoff_factor=0.5,
+                              status_forcelist=[502, 503, 504],
+                              allowed_methods=['GET', 'HEAD'],
+                              raise_on_status=False)
+        )
+        self.session.mount('https://', adapter)
         self.cancel_flag = False
         self.pause_flag = False
         
@@ -39,45 +143,24 @@ class HFDownloader:
         # 移除查询参数
         url = url.split('?')[0]
         
-        # 检查是否是目录URL (tree格式)
-        tree_patterns = [
-            r'hf-mirror\.com/([^/]+)/([^/]+)/tree/([^/]+)(?:/(.*))?',
-            r'huggingface\.co/([^/]+)/([^/]+)/tree/([^/]+)(?:/(.*))?',
-        ]
-        
-        for pattern in tree_patterns:
-            match = re.search(pattern, url)
-            if match:
-                username, model, branch = match.groups()[:3]
-                subpath = match.groups()[3] if len(match.groups()) > 3 else ''
-                repo_info = {
-                    'username': username,
-                    'model': model,
-                    'branch': branch,
-                    'subpath': subpath or ''
-                }
-                return None, None, True, repo_info
-        
-        # 检查单文件URL
-        file_patterns = [
-            # https://hf-mirror.com/username/model/resolve/main/file.bin
-            r'hf-mirror\.com/([^/]+)/([^/]+)/resolve/([^/]+)/(.+)',
-            # https://hf-mirror.com/username/model/blob/main/file.bin
-            r'hf-mirror\.com/([^/]+)/([^/]+)/blob/([^/]+)/(.+)',
-            # https://huggingface.co/username/model/resolve/main/file.bin
-            r'huggingface\.co/([^/]+)/([^/]+)/resolve/([^/]+)/(.+)',
-            # https://huggingface.co/username/model/blob/main/file.bin
-            r'huggingface\.co/([^/]+)/([^/]+)/blob/([^/]+)/(.+)',
-        ]
-        
-        for pattern in file_patterns:
-            match = re.search(pattern, url)
-            if match:
-                username, model, branch, filepath = match.groups()
-                # 将 blob 转换为 resolve 用于下载
-                download_url = f"https://hf-mirror.com/{username}/{model}/resolve/{branch}/{filepath}"
-                filename = os.path.basename(unquote(filepath))
-                return download_url, filename, False, None
+        match = _HF_RE.search(url)
+        # 目录URL (tree格式)
+        if match and match.group('tree_branch'):
+            repo_info = {
+                'username': match.group('username'),
+                'model': match.group('model'),
+                'branch': match.group('tree_branch'),
+                'subpath': match.group('subpath') or ''
+            }
+            return None, None, True, repo_info
+        
+        # 单文件URL
+        if match:
+            username, model, branch, filepath = match.group('username', 'model', 'branch', 'filepath')
+            # 将 blob 转换为 resolve 用于下载
+            download_url = f"https://hf-mirror.com/{username}/{model}/resolve/{branch}/{filepath}"
+            filename = os.path.basename(unquote(filepath))
+            return download_url, filename, False, None
         
         # 如果是直接的文件URL
         if url.startswith('http'):
@@ -100,11 +183,11 @@ class HFDownloader:
     
     def format_size(self, size):
         """格式化文件大小"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
-        return f"{size:.2f} PB"
+        if size < 1024:
+            return f"{size:.2f} B"
+        # 由二进制位数直接得到单位，只做一次除法
+        i = min(5, (int(size).bit_length() - 1) // 10)
+        return f"{size / (1 << (10 * i)):.2f} {_SIZE_UNITS[i]}"
     
     def format_speed(self, speed):
         """格式化下载速度"""
@@ -120,65 +203,92 @@ class HFDownloader:
             progress_callback: 进度回调函数 (downloaded, total, speed, percentage)
             status_callback: 状态回调函数 (message)
         """
-        self.cancel_flag = False
-        self.pause_flag = False
+        # 不在此处重置 cancel_flag / pause_flag：批量并行下载时由调用方统一管理
         
         # 确保目录存在
         os.makedirs(os.path.dirname(save_path) if os.path.dirname(save_path) else '.', exist_ok=True)
         
-        # 检查已下载的文件大小
-        downloaded_size = 0
-        if os.path.exists(save_path):
-            downloaded_size = os.path.getsize(save_path)
-        
-        # 获取文件总大小
-        total_size = self.get_file_size(url)
-        
-        if total_size == 0:
-            if status_callback:
-                status_callback("无法获取文件大小，尝试直接下载...")
-        
-        # 如果文件已完整下载
-        if downloaded_size > 0 and downloaded_size == total_size:
-            if status_callback:
-                status_callback("文件已存在且完整，无需重新下载")
-            if progress_callback:
-                progress_callback(total_size, total_size, 0, 100.0)
-            return True
-        
-        # 设置断点续传的请求头
-        headers = self.session.headers.copy()
-        if downloaded_size > 0:
-            headers['Range'] = f'bytes={downloaded_size}-'
-            if status_callback:
-                status_callback(f"从 {self.format_size(downloaded_size)} 处继续下载...")
+        # 检查已下载的文件大小（一次 stat 代替 exists + getsize）
+        try:
+            downloaded_size = os.stat(save_path).st_size
+        except OSError:
+            downloaded_size = 0
+        
+        # 分段下载会预分配文件，存在进度文件时不能按文件大小续传
+        state_path = save_path + PART_SUFFIX
+        resume_ranged = os.path.exists(state_path)
+        if resume_ranged:
+            downloaded_size = 0
+        
+        # 总是携带 Range：总大小直接从 GET 响应头获取，不再单独发送 HEAD
+        # 只传入 Range，其余请求头由 session 自动合并
+        headers = {'Range': f'bytes={downloaded_size}-'}
+        if downloaded_size > 0 and status_callback:
+            status_callback(f"从 {self.format_size(downloaded_size)} 处继续下载...")
         
         try:
             response = self.session.get(url, headers=headers, stream=True, timeout=30)
             
-            # 检查是否支持断点续传
-            if downloaded_size > 0 and response.status_code != 206:
+            # 416: 起始位置已超出文件末尾，说明文件已完整
+            if response.status_code == 416:
+                response.close()
+                if downloaded_size == 0:
+                    open(save_path, 'wb').close()  # 空文件
+                if status_callback:
+                    status_callback("文件已存在且完整，无需重新下载")
+                if progress_callback:
+                    progress_callback(downloaded_size, downloaded_size, 0, 100.0)
+                return True
+            
+            total_size = _response_total(response, downloaded_size)
+            
+            # 大文件且支持 Range：改为多连接分段下载
+            if response.status_code == 206 and total_size > 0 and (
+                    resume_ranged or (downloaded_size == 0 and total_size >= RANGED_MIN_SIZE)):
+                # 记录强 ETag，续传时用 If-Range 确认远程文件未变化（弱 ETag 不能用于 If-Range）
+                etag = response.headers.get('ETag')
+                if etag and etag.startswith('W/'):
+                    etag = None
+                response.close()  # 分段下载耗时较长，先释放探测请求
+                result = self.download_file_ranged(url, save_path, total_size,
+                                                   progress_callback, status_callback, etag)
+                if result is not None:
+                    return result
+                # 服务器不支持分段 Range：回退到单连接下载
+                response = self.session.get(url, stream=True, timeout=30)
+                total_size = _response_total(response, 0)
+            
+            # 返回完整文件时分段进度已失效
+            if response.status_code == 200 and os.path.exists(state_path):
+                try:
+                    os.remove(state_path)
+                except OSError:
+                    pass
+            
+            # 服务器忽略了 Range 并返回完整文件：直接使用这个响应从头写入
+            if downloaded_size > 0 and response.status_code == 200:
                 if status_callback:
                     status_callback("服务器不支持断点续传，从头开始下载...")
                 downloaded_size = 0
-                response = self.session.get(url, stream=True, timeout=30)
             
             if response.status_code not in [200, 206]:
                 if status_callback:
                     status_callback(f"下载失败: HTTP {response.status_code}")
                 return False
             
+            if total_size == 0 and status_callback:
+                status_callback("无法获取文件大小，尝试直接下载...")
+            
             # 打开文件（追加或新建）
             mode = 'ab' if downloaded_size > 0 else 'wb'
             
             # 下载参数
-            chunk_size = 8192  # 8KB
-            start_time = time.time()
+            start_time = time.monotonic()
             last_update_time = start_time
             last_downloaded = downloaded_size
             
             with open(save_path, mode) as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
+                for chunk in _iter_response(response):
                     # 检查暂停标志
                     while self.pause_flag and not self.cancel_flag:
                         time.sleep(0.1)
@@ -194,7 +304,7 @@ class HFDownloader:
                         downloaded_size += len(chunk)
                         
                         # 计算速度和进度
-                        current_time = time.time()
+                        current_time = time.monotonic()
                         if current_time - last_update_time >= 0.5:  # 每0.5秒更新一次
                             elapsed = current_time - last_update_time
                             speed = (downloaded_size - last_downloaded) / elapsed
@@ -220,6 +330,207 @@ class HFDownloader:
                 status_callback(f"下载出错: {str(e)}")
             return False
     
+    def _sleep(self, seconds):
+        """重试前等待，期间取消可立即退出；返回是否已取消"""
+        deadline = time.monotonic() + seconds
+        while not self.cancel_flag:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(0.1, remaining))
+        return True
+    
+    def download_file_ranged(self, url, save_path, total_size,
+                             progress_callback=None, status_callback=None, etag=None):
+        """
+        多连接分段下载：预分配文件，各分段线程用 Range 请求写入各自的偏移
+        进度保存在 save_path + PART_SUFFIX 中（url/total/etag/各分段位置），中断后可按分段继续
+        返回 True/False；服务器不支持 Range 或远程文件已变化时返回 None（改为从头单连接下载）
+        """
+        state_path = save_path + PART_SUFFIX
+        state = None
+        if os.path.exists(save_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except Exception:
+                state = None
+        if (not state or state.get('url') != url or state.get('total') != total_size
+                or (etag and state.get('etag') not in (None, etag))):
+            # 没有进度、进度属于其他地址或远程文件已变化：重新分段
+            # 每个分段记录 [起始, 结束, 下一个写入位置]
+            part_size = -(-total_size // RANGED_PARTS)
+            ranges = [[a, min(a + part_size, total_size) - 1, a]
+                      for a in range(0, total_size, part_size)]
+            state = {'url': url, 'total': total_size, 'etag': etag, 'ranges': ranges}
+        ranges = state['ranges']
+        if_range = state.get('etag')
+        aborted = threading.Event()  # 某个分段出错（如磁盘已满），其余分段随之停止
+        
+        def save_state():
+            try:
+                tmp_path = state_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, state_path)
+            except Exception:
+                pass
+        
+        lock = threading.Lock()
+        progress = {
+            'done': total_size - sum(end + 1 - offset for _, end, offset in ranges),
+            'last_time': time.monotonic(),
+            'last_save': time.monotonic(),
+            'no_range': False,
+            'changed': False,
+        }
+        progress['last_done'] = progress['done']
+        
+        if status_callback:
+            status_callback(f"分段下载 x{RANGED_PARTS}，从 {self.format_size(progress['done'])} 处开始...")
+        
+        def on_chunk(r, offset, n):
+            with lock:
+                r[2] = offset
+                progress['done'] += n
+                current_time = time.monotonic()
+                if current_time - progress['last_save'] >= 2:
+                    progress['last_save'] = current_time
+                    save_state()
+                elapsed = current_time - progress['last_time']
+                if elapsed >= 0.5:  # 每0.5秒更新一次
+                    speed = (progress['done'] - progress['last_done']) / elapsed
+                    progress['last_time'] = current_time
+                    progress['last_done'] = progress['done']
+                    if progress_callback:
+                        progress_callback(progress['done'], total_size, speed,
+                                          progress['done'] / total_size * 100)
+        
+        def fetch(r):
+            _, end, offset = r
+            retry_count = 0
+            # 每个线程使用独立的文件句柄，定位后写入（Windows 没有 os.pwrite）
+            with open(save_path, 'r+b') as f:
+                while offset <= end:
+                    if self.cancel_flag or aborted.is_set():
+                        return False
+                    attempt_start = offset
+                    try:
+                        headers = {'Range': f'bytes={offset}-{end}'}
+                        if if_range:
+                            headers['If-Range'] = if_range
+                        with self.session.get(url, headers=headers, stream=True, timeout=30) as response:
+                            if response.status_code == 200:
+                                # 带 If-Range 时返回 200 说明远程文件已变化，否则是服务器不支持 Range
+                                progress['changed' if if_range else 'no_range'] = True
+                                return False
+                            if response.status_code != 206:
+                                return False
+                            f.seek(offset)
+                            for chunk in _iter_response(response, RANGED_CHUNK_SIZE):
+                                while self.pause_flag and not self.cancel_flag:
+                                    time.sleep(0.1)
+                                if self.cancel_flag or aborted.is_set():
+                                    return False
+                                if chunk:
+                                    f.write(chunk)
+                                    offset += len(chunk)
+                                    on_chunk(r, offset, len(chunk))
+                    except NETWORK_ERRORS:
+                        # 本次尝试有进展时重新计数，只有持续无进展才会耗尽重试次数
+                        if offset > attempt_start:
+                            retry_count = 0
+                        retry_count += 1
+                        if retry_count >= 5:
+                            return False
+                        if self._sleep(_retry_delay(retry_count)):
+                            return False
+                    except Exception:
+                        aborted.set()
+                        raise
+            return True
+        
+        try:
+            # 预分配文件大小，各分段直接写入对应偏移
+            with open(save_path, 'ab') as f:
+                if f.tell() != total_size:
+                    f.truncate(total_size)
+            save_state()
+            pending = [r for r in ranges if r[2] <= r[1]]
+            with ThreadPoolExecutor(max_workers=RANGED_PARTS) as pool:
+                results = list(pool.map(fetch, pending))
+        except Exception as e:
+            if status_callback:
+                status_callback(f"下载出错: {str(e)}")
+            results = [False]
+        
+        if progress['no_range'] or progress['changed']:
+            try:
+                os.remove(state_path)
+            except OSError:
+                pass
+            if status_callback:
+                if progress['changed']:
+                    status_callback("远程文件已变化，从头重新下载...")
+                else:
+                    status_callback("服务器不支持分段下载，改用单连接下载...")
+            return None
+        
+        if not all(results):
+            save_state()
+            if status_callback:
+                status_callback("下载已取消" if self.cancel_flag else "分段下载失败，可稍后继续")
+            return False
+        
+        try:
+            os.remove(state_path)
+        except OSError:
+            pass
+        if progress_callback:
+            progress_callback(total_size, total_size, 0, 100.0)
+        if status_callback:
+            status_callback("下载完成！")
+        return True
+    
+    def download_files_parallel(self, files, save_dir, max_workers=BATCH_WORKERS,
+                                progress_callback=None, status_callback=None, file_callback=None):
+        """
+        并行下载多个文件，共用同一个 session 的连接池
+        files: [(relative_path, download_url, file_size), ...]
+        file_callback: 每个文件结束时调用 (relative_path, success)
+        返回: (成功数, 失败数)
+        """
+        progress = None
+        if progress_callback:
+            progress = _BatchProgress(sum(size for _, _, size in files), progress_callback)
+        
+        def worker(path, url):
+            if self.cancel_flag:
+                return False
+            name = path.rpartition('/')[2]  # 仓库内路径总是用 '/' 分隔
+            return self.download_file(
+                url, os.path.join(save_dir, path),
+                progress_callback=partial(progress.update, path) if progress else None,
+                status_callback=(lambda msg: status_callback(f"{name}: {msg}")) if status_callback else None
+            )
+        
+        success_count = 0
+        fail_count = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(worker, path, url): path for path, url, _ in files}
+            for future in as_completed(futures):
+                try:
+                    ok = future.result()
+                except Exception:
+                    ok = False
+                if ok:
+                    success_count += 1
+                else:
+                    fail_count += 1
+                if file_callback:
+                    file_callback(futures[future], ok)
+        return success_count, fail_count
+    
     def cancel_download(self):
         """取消下载"""
         self.cancel_flag = True
@@ -277,8 +588,6 @@ class DownloaderGUI:
         self.download_thread = None
         self.is_downloading = False
         self.batch_mode = False  # 批量下载模式
-        self.file_queue = []  # 文件下载队列
-        self.current_file_index = 0  # 当前下载文件索引
         self.all_files = []  # 所有文件列表
         self.file_selection_window = None  # 文件选择窗口
         
@@ -470,6 +779,8 @@ class DownloaderGUI:
         self.pause_btn['state'] = tk.NORMAL
         self.cancel_btn['state'] = tk.NORMAL
         self.is_downloading = True
+        self.downloader.cancel_flag = False
+        self.downloader.pause_flag = False
         
         # 在新线程中下载
         self.download_thread = threading.Thread(
@@ -638,9 +949,6 @@ class DownloaderGUI:
                 messagebox.showwarning("警告", "请至少选择一个文件")
                 return
             
-            self.file_queue = selected_files
-            self.current_file_index = 0
-            
             self.file_selection_window.destroy()
             self.log_message(f"\n已选择 {len(selected_files)} 个文件开始下载")
             
@@ -651,7 +959,15 @@ class DownloaderGUI:
                 self.log_message(f"  ... 还有 {len(selected_files)-5} 个文件")
             
             self._enable_download_controls()
-            self._download_next_file(save_dir)
+            self.batch_label.config(text=f"整体进度: 0/{len(selected_files)} 文件")
+            
+            # 在新线程中并行下载
+            self.download_thread = threading.Thread(
+                target=self._batch_download_worker,
+                args=(selected_files, save_dir),
+                daemon=True
+            )
+            self.download_thread.start()
         
         ttk.Button(button_frame, text="开始下载", 
                   command=start_selected_download).pack(side=tk.LEFT, padx=5)
@@ -690,57 +1006,44 @@ class DownloaderGUI:
         self.pause_btn['state'] = tk.NORMAL
         self.cancel_btn['state'] = tk.NORMAL
         self.is_downloading = True
+        self.downloader.cancel_flag = False
+        self.downloader.pause_flag = False
     
-    def _download_next_file(self, save_dir):
-        """下载队列中的下一个文件"""
-        if self.current_file_index >= len(self.file_queue):
-            # 所有文件下载完成
-            self.log_message("✅ 所有文件下载完成！")
-            self._download_finished(True)
-            return
-        
-        relative_path, download_url, file_size = self.file_queue[self.current_file_index]
-        
-        # 更新批量进度
-        self.batch_label.config(text=f"整体进度: {self.current_file_index + 1}/{len(self.file_queue)} 文件")
-        self.log_message(f"\n⬇️ [{self.current_file_index + 1}/{len(self.file_queue)}] 下载: {relative_path}")
-        
-        # 确保子目录存在
-        save_path = os.path.join(save_dir, relative_path)
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        
-        # 在新线程中下载
-        self.download_thread = threading.Thread(
-            target=self._batch_download_worker,
-            args=(download_url, save_path, save_dir),
-            daemon=True
-        )
-        self.download_thread.start()
-    
-    def _batch_download_worker(self, url, save_path, save_dir):
-        """批量下载工作线程"""
-        success = self.downloader.download_file(
-            url,
-            save_path,
-            progress_callback=self.update_progress,
-            status_callback=self.update_status
+    def _batch_download_worker(self, files, save_dir):
+        """批量下载工作线程：多个文件并行下载"""
+        total = len(files)
+        finished = [0]
+        
+        def on_file_done(path, ok):
+            finished[0] += 1
+            n = finished[0]
+            self.root.after(0, lambda: self.batch_label.config(text=f"整体进度: {n}/{total} 文件"))
+            self.root.after(0, self.log_message, f"{'✅' if ok else '❌'} [{n}/{total}] {path}")
+        
+        # 回调来自多个下载线程，Tk 控件只能在界面线程中更新
+        _, fail_count = self.downloader.download_files_parallel(
+            files, save_dir,
+            progress_callback=self._in_ui_thread(self.update_progress),
+            status_callback=self._in_ui_thread(self.update_status),
+            file_callback=on_file_done
         )
         
-        if success or not self.is_downloading:  # 成功或已取消
-            self.current_file_index += 1
-            if self.is_downloading:  # 如果没有取消，继续下一个
-                self.root.after(0, lambda: self._download_next_file(save_dir))
-        else:
-            # 下载失败
-            self.root.after(0, lambda: self._download_finished(False))
+        self.is_downloading = False
+        if fail_count == 0:
+            self.root.after(0, lambda: self.log_message("✅ 所有文件下载完成！"))
+        self.root.after(0, self._download_finished, fail_count == 0)
+    
+    def _in_ui_thread(self, func):
+        """包装回调：从下载线程调用时交给界面线程执行"""
+        return lambda *args: self.root.after(0, func, *args)
     
     def _download_worker(self, url, save_path):
         """下载工作线程"""
         success = self.downloader.download_file(
             url,
             save_path,
-            progress_callback=self.update_progress,
-            status_callback=self.update_status
+            progress_callback=self._in_ui_thread(self.update_progress),
+            status_callback=self._in_ui_thread(self.update_status)
         )
         
         self.is_downloading = False
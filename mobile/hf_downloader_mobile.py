@@ -7,7 +7,6 @@ HuggingFace 下载工具 - 移动端版本 (Android)
 
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
 from kivy.uix.button import Button
@@ -15,6 +14,10 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.progressbar import ProgressBar
 from kivy.uix.checkbox import CheckBox
 from kivy.uix.popup import Popup
+from kivy.uix.spinner import Spinner
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.clock import Clock
 from kivy.utils import platform
 from kivy.core.window import Window
@@ -22,23 +25,29 @@ from kivy.core.text import LabelBase
 from kivy.resources import resource_add_path
 
 import os
-import requests
+import mmap
+import hashlib
+import queue
+import random
 import threading
 import re
 import json
+import socket
 import time
+from collections import deque
+from contextlib import contextmanager
 from urllib.parse import urlparse, unquote
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# requests / urllib3 在首次联网时才导入（见 _create_session），缩短冷启动时间
+
+# Java 类引用 - 只保留必要的，首次使用时由 _load_android_classes 解析
+PythonActivity = Context = PowerManager = cast = None
 
 # Android 特定导入
 if platform == 'android':
     from android.permissions import request_permissions, Permission
-    from jnius import autoclass, cast
-    
-    # Java 类引用 - 只保留必要的
-    PythonActivity = autoclass('org.kivy.android.PythonActivity')
-    Context = autoclass('android.content.Context')
-    PowerManager = autoclass('android.os.PowerManager')
     
     # 注册中文字体（使用 Android 系统字体）
     try:
@@ -49,60 +58,456 @@ if platform == 'android':
         except:
             pass
 
+# 下载参数
+CHUNK_SIZE = 1024 * 1024            # 每次从网络读取 1 MiB
+PROGRESS_INTERVAL = 0.2             # 进度回调最小间隔（秒）
+WRITE_QUEUE_DEPTH = 8               # 等待写盘的数据块上限（共 8 MiB）
+
+# 批量下载参数
+BATCH_WORKERS = 4                       # 并行下载的文件数（默认值）
+BATCH_WORKER_CHOICES = ('1', '2', '4', '6', '8')  # 界面中可选的并行数
+LARGE_FILE_SIZE = 100 * 1024 * 1024     # 大文件单独排队，避免阻塞小文件
+
+# 分段并行下载参数（单个大文件）
+RANGED_MIN_SIZE = 64 * 1024 * 1024      # 剩余大小超过该值时分段下载
+RANGED_PARTS = 4                        # 同时下载的分段数
+RANGED_PART_SIZE = 32 * 1024 * 1024     # 每个分段的大小
+PART_SUFFIX = '.part'                   # 分段下载进度文件后缀
+
+# 文件选择列表的固定行高（像素），行控件与 RecycleBoxLayout 共用，布局无需逐行测量
+FILE_ROW_HEIGHT = 80
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# HuggingFace URL 解析（模块加载时编译一次；目录与单文件合并为一个模式，一次匹配即可区分）
+_HF_RE = re.compile(r'(?:hf-mirror\.com|huggingface\.co)/(?P<username>[^/]+)/(?P<model>[^/]+)/'
+                    r'(?:tree/(?P<tree_branch>[^/]+)(?:/(?P<subpath>.*))?'
+                    r'|(?:resolve|blob)/(?P<branch>[^/]+)/(?P<filepath>.+))')
+
 # 设置窗口大小（开发时使用，打包后自动适配手机屏幕）
 if platform != 'android':
     Window.size = (360, 640)
 
 
+def _load_android_classes():
+    """首次使用时再解析 Java 类，避免 autoclass 反射拖慢应用启动"""
+    global PythonActivity, Context, PowerManager, cast
+    if PythonActivity is None:
+        from jnius import autoclass, cast
+        PythonActivity = autoclass('org.kivy.android.PythonActivity')
+        Context = autoclass('android.content.Context')
+        PowerManager = autoclass('android.os.PowerManager')
+
+
+def _create_session():
+    """
+    创建带连接池的 requests 会话
+    返回: (session, network_errors)
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    from urllib3.exceptions import ProtocolError, ReadTimeoutError
+    from urllib3.connection import HTTPConnection
+    
+    class TunedAdapter(HTTPAdapter):
+        """
+        连接池 socket 选项：保留 urllib3 默认的 TCP_NODELAY，并启用 SO_KEEPALIVE
+        不设置 SO_RCVBUF：手动设置会关闭内核的接收窗口自动调整，且受 rmem_max 限制
+        """
+        
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+            super().init_poolmanager(*args, **kwargs)
+    
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36'
+    })
+    # 复用连接池，避免每个文件重新进行 TLS 握手
+    adapter = TunedAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=5, backoff_factor=0.5,
+                          status_forcelist=[502, 503, 504],
+                          allowed_methods=['GET', 'HEAD'],
+                          raise_on_status=False)
+    )
+    session.mount('https://', adapter)
+    
+    # 直接读取 response.raw 时 urllib3 的异常不会被 requests 转换，需要一并捕获
+    # 内置 ConnectionError 用于响应体提前结束（见 download_file）
+    network_errors = (requests.exceptions.ConnectionError,
+                      requests.exceptions.Timeout,
+                      requests.exceptions.ChunkedEncodingError,
+                      ProtocolError,
+                      ReadTimeoutError,
+                      ConnectionError)
+    return session, network_errors
+
+
+def _response_total(response, offset=0):
+    """从响应头获取文件总大小：优先取 Content-Range 中的总长度，其次 Content-Length"""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    content_length = response.headers.get('Content-Length', '')
+    if content_length.isdigit():
+        return int(content_length) + (offset if response.status_code == 206 else 0)
+    return 0
+
+
+def _iter_json_array(response, chunk_size=64 * 1024):
+    """
+    边接收边解析 JSON 数组，逐个产出其中的元素，不把整个响应体和完整列表载入内存
+    """
+    decoder = json.JSONDecoder()
+    if not response.encoding:
+        response.encoding = 'utf-8'
+    buf = ''
+    pos = 0
+    started = False
+    for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            # 跳过空白和元素间的逗号
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError('Expected JSON array')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                item, pos_end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # 元素还不完整，继续接收
+            pos = pos_end
+            yield item
+    raise ValueError('Incomplete JSON array')
+
+
+def _iter_response(response, chunk_size=CHUNK_SIZE, buffers=None):
+    """
+    逐块读取响应体。未压缩时用 readinto 读入同一个缓冲区，不为每块分配新的 bytes
+    注意：产出的是缓冲区的视图，调用方必须在取下一块之前用完
+    buffers: 可选的缓冲区队列（见 _DiskWriter），每块从中取一个缓冲区，由使用方归还
+    """
+    if response.headers.get('Content-Encoding', 'identity') != 'identity':
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    view = memoryview(bytearray(chunk_size))
+    while True:
+        if buffers is not None:
+            view = memoryview(buffers.get())
+        n = response.raw.readinto(view)
+        if not n:
+            break
+        yield view[:n]
+
+
+class _DiskWriter:
+    """
+    后台写盘线程：下载线程把数据块放入有界队列，由写盘线程写入文件
+    闪存写入卡顿时网络读取不会随之停止；缓冲区循环使用，内存占用有上限
+    depth 为 0 时不启动线程也不分配缓冲区，直接在调用线程中写入（用于小文件）
+    """
+    
+    def __init__(self, fd, chunk_size=CHUNK_SIZE, depth=WRITE_QUEUE_DEPTH):
+        self.fd = fd
+        self._error = None
+        self._thread = None
+        self.buffers = None
+        if depth <= 0:
+            return
+        self.buffers = queue.Queue()
+        for _ in range(depth):
+            self.buffers.put(bytearray(chunk_size))
+        self._queue = queue.Queue(maxsize=depth)
+        self._thread = threading.Thread(target=self._run, name='hf-writer', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is None:
+                try:
+                    _write_all(self.fd, data)
+                except OSError as e:
+                    self._error = e
+            # 缓冲区视图写完后归还，供下一次 readinto 使用
+            if isinstance(data, memoryview) and isinstance(data.obj, bytearray):
+                self.buffers.put(data.obj)
+    
+    def write(self, data):
+        """排队写入（队列满时阻塞）；写盘出错时在下载线程中抛出"""
+        if self._thread is None:
+            _write_all(self.fd, data)
+            return
+        if self._error is not None:
+            raise self._error
+        self._queue.put(data)
+    
+    def close(self):
+        """等待已排队的数据全部写完（可重复调用）"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def _file_size(path):
+    """返回文件大小，文件不存在时返回 0（一次 stat 代替 exists + getsize）"""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def _dir_file_sizes(dir_path):
+    """一次 scandir 得到目录中所有文件的大小 {文件名: 大小}"""
+    try:
+        with os.scandir(dir_path) as it:
+            return {entry.name: entry.stat().st_size for entry in it if entry.is_file()}
+    except OSError:
+        return {}
+
+
+def _index_existing(save_dir, paths):
+    """
+    获取本地已有文件的大小 {相对路径: 大小}（含 .part 进度文件）
+    只扫描这些文件所在的目录，每个目录一次 scandir
+    """
+    sizes = {}
+    for rel_dir in {p.rpartition('/')[0] for p in paths}:
+        prefix = rel_dir + '/' if rel_dir else ''
+        for name, size in _dir_file_sizes(os.path.join(save_dir, rel_dir)).items():
+            sizes[prefix + name] = size
+    return sizes
+
+
+def _format_size(size):
+    """格式化文件大小（进度中的总大小由界面单独缓存，速度/已下载量每次都不同，不做缓存）"""
+    if size < 1024:
+        return f"{size:.2f} B"
+    # 由二进制位数直接得到单位，只做一次除法
+    i = min(5, (int(size).bit_length() - 1) // 10)
+    return f"{size / (1 << (10 * i)):.2f} {_SIZE_UNITS[i]}"
+
+
+def _sha256_file(path):
+    """
+    计算文件的 SHA256。通过 mmap 一次交给 hashlib，由 OpenSSL 的优化实现处理整个文件
+    mmap 不可用（空文件、32 位地址空间不足等）时退回分块读取
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(memoryview(m))
+                return h.hexdigest()
+        except (ValueError, OSError, OverflowError):
+            pass
+        view = memoryview(bytearray(CHUNK_SIZE))
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def _abort_responses(responses):
+    """
+    中断正在读取的响应，在后台线程中调用
+    urllib3 >= 2.3 的 shutdown() 直接关闭底层 socket，阻塞中的读取立即返回；
+    旧版本只能 close()，它会等待正在进行的读取结束，因此不能在界面线程调用
+    """
+    for response in responses:
+        try:
+            shutdown = getattr(response.raw, 'shutdown', None)
+            if shutdown is not None:
+                shutdown()
+            else:
+                response.close()
+        except Exception:
+            pass
+
+
+def _prefix_status(callback, prefix, message):
+    """给状态消息加上文件名前缀后回调"""
+    callback(f"{prefix}: {message}")
+
+
+def _retry_delay(retry_count):
+    """重试等待时间：指数退避加随机抖动，最长约 30 秒"""
+    return min(30.0, 2 ** retry_count) + random.random()
+
+
+def _preallocate(fd, size):
+    """预分配文件空间：优先 posix_fallocate 一次分配连续空间，不支持时退回 ftruncate"""
+    if os.fstat(fd).st_size > size:
+        os.ftruncate(fd, size)
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)
+
+
+def _write_all(fd, data):
+    """写入全部数据（os.write 可能只写入一部分）"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _drop_cache(fd):
+    """数据落盘后通知内核丢弃该文件的页缓存，减轻内存压力，避免应用在后台被系统杀死"""
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except (AttributeError, OSError):
+        pass
+
+
+def _pwrite_all(fd, data, offset):
+    """在指定偏移写入全部数据"""
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+class _BatchProgress:
+    """汇总多个并行下载的进度，节流后统一回调"""
+    
+    def __init__(self, total, callback):
+        self.total = total
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._per_file = {}
+        self._downloaded = 0
+        self._last_time = time.monotonic()
+        self._last_downloaded = 0
+    
+    def update(self, path, downloaded, total, speed=0):
+        """单个文件的进度回调，签名与 download_file 的 progress_callback 一致"""
+        with self._lock:
+            self._downloaded += downloaded - self._per_file.get(path, 0)
+            self._per_file[path] = downloaded
+            current_time = time.monotonic()
+            time_diff = current_time - self._last_time
+            finished = self.total > 0 and self._downloaded >= self.total
+            if time_diff < PROGRESS_INTERVAL and not finished:
+                return
+            speed = (self._downloaded - self._last_downloaded) / time_diff if time_diff > 0 else 0
+            self._last_time = current_time
+            self._last_downloaded = self._downloaded
+            done = self._downloaded
+        
+        if self.total > 0:
+            self.callback(done, self.total, max(0, speed))
+
+
 class HFDownloader:
     """HuggingFace 文件下载器核心类"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36'
-        })
-        self.cancel_flag = False
-        self.pause_flag = False
-        
+        # 会话在首次联网时创建（在下载线程中导入 requests，不阻塞界面启动）
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._network_errors = ()
+        # 暂停/取消使用 Event，暂停时线程阻塞等待而不是轮询
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._cancel_event = threading.Event()
+        # 正在读取的响应，取消时从界面线程直接关闭，阻塞中的读取立即返回
+        self._active_responses = set()
+        self._responses_lock = threading.Lock()
+        # 文件列表中 LFS 文件的 SHA256 {download_url: sha256}，下载完成后用于校验
+        self.lfs_sha256 = {}
+    
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session, self._network_errors = _create_session()
+        return self._session
+    
+    @property
+    def pause_flag(self):
+        return not self._resume_event.is_set()
+    
+    @pause_flag.setter
+    def pause_flag(self, value):
+        if value:
+            self._resume_event.clear()
+        else:
+            self._resume_event.set()
+    
+    @property
+    def cancel_flag(self):
+        return self._cancel_event.is_set()
+    
+    @cancel_flag.setter
+    def cancel_flag(self, value):
+        if value:
+            self._cancel_event.set()
+            self._resume_event.set()  # 唤醒处于暂停中的下载线程
+        else:
+            self._cancel_event.clear()
+    
+    def pause_download(self):
+        """暂停下载"""
+        self._resume_event.clear()
+    
+    def resume_download(self):
+        """恢复下载"""
+        self._resume_event.set()
+    
+    def cancel_download(self):
+        """取消下载"""
+        self.cancel_flag = True
+        # 中断进行中的连接，不必等到下一个数据块读完才发现取消
+        with self._responses_lock:
+            responses = list(self._active_responses)
+        if responses:
+            threading.Thread(target=_abort_responses, args=(responses,), daemon=True).start()
+    
     def parse_hf_url(self, url):
         """解析 HuggingFace URL"""
         url = url.split('?')[0]
         
-        # 检查是否是目录URL
-        tree_patterns = [
-            r'hf-mirror\.com/([^/]+)/([^/]+)/tree/([^/]+)(?:/(.*))?',
-            r'huggingface\.co/([^/]+)/([^/]+)/tree/([^/]+)(?:/(.*))?',
-        ]
-        
-        for pattern in tree_patterns:
-            match = re.search(pattern, url)
-            if match:
-                username, model, branch = match.groups()[:3]
-                subpath = match.groups()[3] if len(match.groups()) > 3 else ''
-                repo_info = {
-                    'username': username,
-                    'model': model,
-                    'branch': branch,
-                    'subpath': subpath or ''
-                }
-                return None, None, True, repo_info
-        
-        # 检查单文件URL
-        file_patterns = [
-            r'hf-mirror\.com/([^/]+)/([^/]+)/resolve/([^/]+)/(.+)',
-            r'hf-mirror\.com/([^/]+)/([^/]+)/blob/([^/]+)/(.+)',
-            r'huggingface\.co/([^/]+)/([^/]+)/resolve/([^/]+)/(.+)',
-            r'huggingface\.co/([^/]+)/([^/]+)/blob/([^/]+)/(.+)',
-        ]
+        match = _HF_RE.search(url)
+        # 目录URL
+        if match and match.group('tree_branch'):
+            repo_info = {
+                'username': match.group('username'),
+                'model': match.group('model'),
+                'branch': match.group('tree_branch'),
+                'subpath': match.group('subpath') or ''
+            }
+            return None, None, True, repo_info
         
-        for pattern in file_patterns:
-            match = re.search(pattern, url)
-            if match:
-                username, model, branch, filepath = match.groups()
-                download_url = f"https://hf-mirror.com/{username}/{model}/resolve/{branch}/{filepath}"
-                filename = os.path.basename(unquote(filepath))
-                return download_url, filename, False, None
+        # 单文件URL
+        if match:
+            username, model, branch, filepath = match.group('username', 'model', 'branch', 'filepath')
+            download_url = f"https://hf-mirror.com/{username}/{model}/resolve/{branch}/{filepath}"
+            filename = os.path.basename(unquote(filepath))
+            return download_url, filename, False, None
         
         if url.startswith('http'):
             filename = os.path.basename(unquote(urlparse(url).path))
@@ -124,171 +529,584 @@ class HFDownloader:
     
     def format_size(self, size):
         """格式化文件大小"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
-        return f"{size:.2f} PB"
+        return _format_size(size)
     
-    def download_file(self, url, save_path, progress_callback=None, status_callback=None):
-        """下载文件，支持断点续传，网络异常安全处理"""
-        self.cancel_flag = False
-        # 不重置 pause_flag，保持暴停状态
+    def download_file(self, url, save_path, progress_callback=None, status_callback=None,
+                      expected_size=0, make_dirs=True):
+        """
+        下载文件，支持断点续传，网络异常安全处理
+        progress_callback(downloaded, total, speed) 在下载线程中直接调用（百分比由界面计算），
+        status_callback(message) 也在下载线程中直接调用，需可在任意线程使用（如 post_log）
+        expected_size: 已知的文件大小（如来自仓库文件列表），本地大小一致时不发起任何请求
+        make_dirs: 调用方已创建好父目录时传 False，不再逐个文件检查
+        """
+        # 不在此处重置 cancel_flag / pause_flag：批量并行下载时由调用方统一管理
         
-        try:
-            dir_path = os.path.dirname(save_path)
-            if dir_path:
-                os.makedirs(dir_path, exist_ok=True)
-        except Exception as e:
-            if status_callback:
-                Clock.schedule_once(lambda dt: status_callback(f"Path error: {e}"), 0)
-            return False
+        if make_dirs:
+            try:
+                dir_path = os.path.dirname(save_path)
+                if dir_path:
+                    os.makedirs(dir_path, exist_ok=True)
+            except Exception as e:
+                if status_callback:
+                    status_callback(f"Path error: {e}")
+                return False
+        
+        # 存在分段进度文件：继续未完成的分段下载
+        if hasattr(os, 'pwrite') and os.path.exists(save_path + PART_SUFFIX):
+            return self.download_file_ranged(url, save_path,
+                                             progress_callback=progress_callback,
+                                             status_callback=status_callback)
         
         # 检查已下载大小（断点续传）
-        downloaded_size = 0
-        if os.path.exists(save_path):
-            downloaded_size = os.path.getsize(save_path)
+        downloaded_size = _file_size(save_path)
         
-        # 获取文件总大小
-        total_size = 0
-        try:
-            total_size = self.get_file_size(url)
-        except:
-            pass
+        # 本地文件比已知大小还大：内容不可信，从头下载（否则 Range 请求会得到 416 被误判为已完成）
+        if expected_size > 0 and downloaded_size > expected_size:
+            downloaded_size = 0
         
-        # 如果文件已完成
-        if downloaded_size > 0 and total_size > 0 and downloaded_size >= total_size:
+        if expected_size > 0 and downloaded_size == expected_size:
             if status_callback:
-                Clock.schedule_once(lambda dt: status_callback("File exists"), 0)
+                status_callback("File exists")
             if progress_callback:
-                Clock.schedule_once(lambda dt: progress_callback(100.0, total_size, total_size), 0)
+                progress_callback(downloaded_size, downloaded_size)
             return True
         
-        headers = self.session.headers.copy()
+        # 总大小直接从 GET 响应头获取，不再单独发送 HEAD
+        total_size = 0
+        
+        # 总是携带 Range：返回 206 即说明服务器支持分段下载
+        # 只传入 Range，其余请求头由 session 自动合并，无需复制 session.headers
+        headers = {'Range': f'bytes={downloaded_size}-'}
         if downloaded_size > 0:
-            headers['Range'] = f'bytes={downloaded_size}-'
             if status_callback:
-                Clock.schedule_once(lambda dt, d=downloaded_size: 
-                    status_callback(f"Resuming from {self.format_size(d)}..."), 0)
+                status_callback(f"Resuming from {self.format_size(downloaded_size)}...")
         
         max_retries = 5
         retry_count = 0
         
         while retry_count < max_retries:
+            attempt_start = downloaded_size
             try:
-                response = self.session.get(url, headers=headers, stream=True, timeout=60)
-                
-                # 服务器不支持 Range，重新开始
-                if downloaded_size > 0 and response.status_code == 200:
-                    downloaded_size = 0
-                    if status_callback:
-                        Clock.schedule_once(lambda dt: status_callback("Server no resume, restart..."), 0)
-                
-                if response.status_code not in [200, 206]:
-                    if status_callback:
-                        Clock.schedule_once(lambda dt, c=response.status_code: 
-                            status_callback(f"HTTP {c}"), 0)
-                    return False
-                
-                # 从响应头获取总大小
-                if total_size == 0:
-                    content_length = response.headers.get('Content-Length')
-                    if content_length:
-                        total_size = int(content_length) + downloaded_size
-                
-                mode = 'ab' if downloaded_size > 0 else 'wb'
-                chunk_size = 8192
-                last_time = time.time()
-                last_downloaded = downloaded_size
-                speed = 0
-                
-                with open(save_path, mode) as f:
-                    for chunk in response.iter_content(chunk_size=chunk_size):
-                        # 暂停处理
-                        while self.pause_flag and not self.cancel_flag:
-                            time.sleep(0.1)
-                            last_time = time.time()
-                            last_downloaded = downloaded_size
-                        
-                        if self.cancel_flag:
-                            if status_callback:
-                                Clock.schedule_once(lambda dt: status_callback("Cancelled"), 0)
-                            return False
-                        
-                        if chunk:
-                            f.write(chunk)
-                            downloaded_size += len(chunk)
-                            
+                # with 保证取消/出错返回时也会关闭响应，连接及时归还连接池复用
+                with self._stream(url, headers) as response:
+                    # 416: 请求的起始位置已超出文件末尾，说明文件已完成
+                    if response.status_code == 416:
+                        if downloaded_size == 0:
+                            open(save_path, 'wb').close()  # 空文件
+                        if status_callback:
+                            status_callback("File exists")
+                        if progress_callback:
+                            progress_callback(downloaded_size, downloaded_size)
+                        return True
+                    
+                    # 服务器不支持 Range，重新开始
+                    if downloaded_size > 0 and response.status_code == 200:
+                        downloaded_size = 0
+                        if status_callback:
+                            status_callback("Server no resume, restart...")
+                    
+                    if response.status_code not in [200, 206]:
+                        if status_callback:
+                            status_callback(f"HTTP {response.status_code}")
+                        return False
+                    
+                    # 从响应头获取总大小（Content-Range 中的总长度优先）
+                    if total_size == 0:
+                        total_size = _response_total(response, downloaded_size)
+                    
+                    # 大文件且支持 Range：改为多连接分段下载
+                    if (response.status_code == 206 and hasattr(os, 'pwrite')
+                            and total_size - downloaded_size >= RANGED_MIN_SIZE):
+                        # 记录强 ETag，续传时用 If-Range 确认远程文件未变化（弱 ETag 不能用于 If-Range）
+                        etag = response.headers.get('ETag')
+                        if etag and etag.startswith('W/'):
+                            etag = None
+                        response.close()  # 分段下载耗时较长，先释放探测请求
+                        return self.download_file_ranged(url, save_path, total_size, downloaded_size,
+                                                         progress_callback=progress_callback,
+                                                         status_callback=status_callback,
+                                                         etag=etag)
+                    
+                    last_time = time.monotonic()
+                    last_downloaded = downloaded_size
+                    last_report = last_time
+                    speed = 0
+                    
+                    # 循环前选定进度上报函数，避免每个数据块都判断回调和总大小
+                    if progress_callback and total_size > 0:
+                        def _report(current):
+                            nonlocal last_time, last_downloaded, last_report, speed
                             # 计算速度（每0.5秒更新一次）
-                            current_time = time.time()
+                            current_time = time.monotonic()
                             time_diff = current_time - last_time
                             if time_diff >= 0.5:
-                                speed = (downloaded_size - last_downloaded) / time_diff
+                                speed = (current - last_downloaded) / time_diff
                                 last_time = current_time
+                                last_downloaded = current
+                            
+                            # 节流：最多每 PROGRESS_INTERVAL 秒向 UI 线程投递一次回调
+                            if current_time - last_report >= PROGRESS_INTERVAL:
+                                last_report = current_time
+                                progress_callback(current, total_size, speed)
+                    else:
+                        def _report(current):
+                            pass
+                    
+                    # 直接写原始 fd：每块已有 1 MiB，不再经过 Python 缓冲层复制一次
+                    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if downloaded_size > 0 else os.O_TRUNC)
+                    fd = os.open(save_path, flags | getattr(os, 'O_BINARY', 0), 0o644)
+                    # 缓冲池按剩余大小分配：不超过一个数据块的小文件（如 config.json）直接写入，
+                    # 不启动写盘线程；其余文件的缓冲区数量不超过实际需要的块数
+                    remaining = total_size - downloaded_size if total_size > 0 else 0
+                    if 0 < remaining <= CHUNK_SIZE:
+                        read_size, depth = remaining, 0
+                    elif remaining > 0:
+                        read_size, depth = CHUNK_SIZE, min(WRITE_QUEUE_DEPTH, -(-remaining // CHUNK_SIZE))
+                    else:
+                        read_size, depth = CHUNK_SIZE, WRITE_QUEUE_DEPTH
+                    writer = _DiskWriter(fd, depth=depth)
+                    try:
+                        for chunk in _iter_response(response, read_size, buffers=writer.buffers):
+                            # 暂停处理：阻塞在 Event 上，不占用 CPU
+                            if not self._resume_event.is_set():
+                                self._resume_event.wait()
+                                last_time = time.monotonic()
                                 last_downloaded = downloaded_size
                             
-                            if progress_callback and total_size > 0:
-                                percentage = min(100.0, downloaded_size / total_size * 100)
-                                Clock.schedule_once(lambda dt, p=percentage, d=downloaded_size, t=total_size, s=speed: 
-                                                  progress_callback(p, d, t, s), 0)
-                
-                if status_callback:
-                    Clock.schedule_once(lambda dt: status_callback("Done!"), 0)
-                return True
-                
-            except (requests.exceptions.ConnectionError, 
-                    requests.exceptions.Timeout,
-                    requests.exceptions.ChunkedEncodingError) as e:
+                            if self._cancel_event.is_set():
+                                if status_callback:
+                                    status_callback("Cancelled")
+                                return False
+                            
+                            # _iter_response 不会产出空块
+                            writer.write(chunk)
+                            downloaded_size += len(chunk)
+                            _report(downloaded_size)
+                        writer.close()
+                        _drop_cache(fd)
+                    finally:
+                        # 写盘出错时 close() 会再次抛出同一个错误，fd 仍要关闭
+                        try:
+                            writer.close()
+                        finally:
+                            os.close(fd)
+                    
+                    # 取消时连接可能被关闭而正常读到 EOF，不能当作下载完成
+                    if self._cancel_event.is_set():
+                        if status_callback:
+                            status_callback("Cancelled")
+                        return False
+                    # 数据不足（旧版 urllib3 不检查 Content-Length 等）：按网络错误续传
+                    if total_size and downloaded_size < total_size:
+                        raise ConnectionError('Response ended early')
+                    
+                    # 最终进度
+                    if progress_callback and total_size > 0:
+                        progress_callback(downloaded_size, total_size)
+                    
+                    if status_callback:
+                        status_callback("Done!")
+                    return True
+                    
+            except self._network_errors:
+                if self._cancel_event.is_set():
+                    # 取消时连接被主动关闭，不算网络错误
+                    if status_callback:
+                        status_callback("Cancelled")
+                    return False
+                # 重新获取已下载大小；本次尝试有进展时重新计数，只有持续无进展才会耗尽重试次数
+                downloaded_size = _file_size(save_path)
+                headers['Range'] = f'bytes={downloaded_size}-'
+                if downloaded_size > attempt_start:
+                    retry_count = 0
                 retry_count += 1
                 if status_callback:
-                    Clock.schedule_once(lambda dt, r=retry_count, m=max_retries: 
-                        status_callback(f"Network error, retry {r}/{m}..."), 0)
+                    status_callback(f"Network error, retry {retry_count}/{max_retries}...")
                 
                 if retry_count >= max_retries:
                     if status_callback:
-                        Clock.schedule_once(lambda dt: status_callback("Network failed, will resume later"), 0)
+                        status_callback("Network failed, will resume later")
                     return False
                 
-                time.sleep(3)
-                # 重新获取已下载大小
-                if os.path.exists(save_path):
-                    downloaded_size = os.path.getsize(save_path)
-                    headers['Range'] = f'bytes={downloaded_size}-'
+                # 等待期间取消可立即退出
+                if self._cancel_event.wait(_retry_delay(retry_count)):
+                    return False
                     
             except Exception as e:
                 if status_callback:
-                    Clock.schedule_once(lambda dt, err=str(e)[:30]: 
-                        status_callback(f"Error: {err}"), 0)
+                    if self._cancel_event.is_set():
+                        status_callback("Cancelled")
+                    else:
+                        status_callback(f"Error: {str(e)[:30]}")
                 return False
         
         return False
     
+    @contextmanager
+    def _stream(self, url, headers):
+        """发起流式 GET，并在读取期间登记响应以便取消时关闭；退出时关闭响应，连接归还连接池"""
+        response = self.session.get(url, headers=headers, stream=True, timeout=60)
+        with self._responses_lock:
+            self._active_responses.add(response)
+        try:
+            yield response
+        finally:
+            with self._responses_lock:
+                self._active_responses.discard(response)
+            response.close()
+    
+    def _load_part_state(self, state_path):
+        """读取分段下载进度文件"""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+    
+    def _save_part_state(self, state_path, state):
+        """保存分段下载进度文件（先写临时文件再替换，避免写坏）"""
+        try:
+            tmp_path = state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, state_path)
+        except Exception:
+            pass
+    
+    def shutdown(self):
+        """停止所有下载并释放连接（应用退出时调用）"""
+        self.cancel_download()
+        # 关闭连接池中的空闲连接
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+    
+    def download_file_ranged(self, url, save_path, total_size=0, start=0,
+                             progress_callback=None, status_callback=None,
+                             num_parts=RANGED_PARTS, part_size=RANGED_PART_SIZE, etag=None):
+        """
+        多连接分段下载大文件：预分配文件，各分段用 Range 请求并以 os.pwrite 写入对应偏移
+        进度保存在 save_path + PART_SUFFIX 中（url/total/etag/各分段位置），中断后可按分段继续
+        """
+        state_path = save_path + PART_SUFFIX
+        state = self._load_part_state(state_path)
+        if state and (state.get('url') != url or not os.path.exists(save_path)):
+            state = None  # 数据文件已被删除或进度属于其他地址，进度作废
+        if not state and not total_size:
+            # 进度文件损坏或失效：无法确认哪些数据已写入，删除后重新下载
+            for path in (state_path, save_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return self.download_file(url, save_path, progress_callback, status_callback)
+        if (not state or (total_size and state.get('total') != total_size)
+                or (etag and state.get('etag') not in (None, etag))):
+            if state:
+                start = 0  # 远程文件已变化，从头开始
+            ranges = [[a, min(a + part_size, total_size) - 1, a]
+                      for a in range(start, total_size, part_size)]
+            state = {'url': url, 'total': total_size, 'etag': etag, 'ranges': ranges}
+            self._save_part_state(state_path, state)
+        
+        total_size = state['total']
+        ranges = state['ranges']
+        if_range = state.get('etag')
+        changed = threading.Event()  # If-Range 不匹配：远程文件已变化
+        aborted = threading.Event()  # 某个分段出错（如磁盘已满），其余分段随之停止
+        lock = threading.Lock()
+        progress = {
+            'done': total_size - sum(end + 1 - offset for _, end, offset in ranges),
+            'last_time': time.monotonic(),
+            'last_done': 0,
+            'last_report': 0.0,
+            'last_save': time.monotonic(),
+            'speed': 0,
+        }
+        progress['last_done'] = progress['done']
+        
+        if status_callback:
+            status_callback(f"Parallel x{num_parts} from {self.format_size(progress['done'])}...")
+        
+        def on_chunk(r, offset, n):
+            with lock:
+                r[2] = offset
+                progress['done'] += n
+                current_time = time.monotonic()
+                time_diff = current_time - progress['last_time']
+                if time_diff >= 0.5:
+                    progress['speed'] = (progress['done'] - progress['last_done']) / time_diff
+                    progress['last_time'] = current_time
+                    progress['last_done'] = progress['done']
+                if current_time - progress['last_save'] >= 2:
+                    progress['last_save'] = current_time
+                    self._save_part_state(state_path, state)
+                if not progress_callback or current_time - progress['last_report'] < PROGRESS_INTERVAL:
+                    return
+                progress['last_report'] = current_time
+                d = progress['done']
+                s = progress['speed']
+            progress_callback(d, total_size, s)
+        
+        def fetch(r):
+            _, end, offset = r
+            retry_count = 0
+            while offset <= end:
+                if self._cancel_event.is_set() or aborted.is_set():
+                    return False
+                attempt_start = offset
+                try:
+                    headers = {'Range': f'bytes={offset}-{end}'}
+                    if if_range:
+                        headers['If-Range'] = if_range
+                    with self._stream(url, headers) as response:
+                        if response.status_code != 206:
+                            if if_range and response.status_code == 200:
+                                changed.set()
+                            return False
+                        for chunk in _iter_response(response):
+                            if not self._resume_event.is_set():
+                                self._resume_event.wait()
+                            if self._cancel_event.is_set() or aborted.is_set():
+                                return False
+                            if chunk:
+                                _pwrite_all(fd, chunk, offset)
+                                offset += len(chunk)
+                                on_chunk(r, offset, len(chunk))
+                except self._network_errors:
+                    if offset > attempt_start:
+                        retry_count = 0
+                    retry_count += 1
+                    if retry_count >= 5:
+                        return False
+                    if self._cancel_event.wait(_retry_delay(retry_count)):
+                        return False
+                except Exception:
+                    # 取消时连接被主动关闭，读取可能抛出其他异常
+                    if self._cancel_event.is_set():
+                        return False
+                    aborted.set()
+                    raise
+            return True
+        
+        try:
+            fd = os.open(save_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        except OSError as e:
+            if status_callback:
+                status_callback(f"Error: {str(e)[:30]}")
+            return False
+        
+        try:
+            if os.fstat(fd).st_size != total_size:
+                _preallocate(fd, total_size)
+            pending = [r for r in ranges if r[2] <= r[1]]
+            # 每个文件使用自己的线程池：大文件的大量分段不会让其他文件的分段排队等待
+            # with 退出时等待所有分段线程结束，之后才关闭 fd，否则仍在运行的线程可能写入已被系统复用给其他文件的 fd
+            with ThreadPoolExecutor(max_workers=num_parts, thread_name_prefix='hf-range') as pool:
+                futures = [pool.submit(fetch, r) for r in pending]
+            results = [f.result() for f in futures]  # 分段中的异常在这里重新抛出
+            if all(results):
+                _drop_cache(fd)
+        except Exception as e:
+            results = [False]
+            if status_callback:
+                status_callback(f"Error: {str(e)[:30]}")
+        finally:
+            os.close(fd)
+        
+        if changed.is_set():
+            # 已写入的分段与远程文件不一致，删除后重新下载
+            for path in (state_path, save_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if status_callback:
+                status_callback("Remote file changed, restart...")
+            return self.download_file(url, save_path, progress_callback, status_callback)
+        
+        if not all(results):
+            self._save_part_state(state_path, state)
+            if status_callback:
+                if self._cancel_event.is_set():
+                    status_callback("Cancelled")
+                else:
+                    status_callback("Network failed, will resume later")
+            return False
+        
+        try:
+            os.remove(state_path)
+        except OSError:
+            pass
+        if progress_callback:
+            progress_callback(total_size, total_size)
+        if status_callback:
+            status_callback("Done!")
+        return True
+    
+    def verify_file(self, save_path, expected_sha256, status_callback=None):
+        """校验文件的 SHA256，不一致时删除文件，下次会重新下载"""
+        try:
+            if _sha256_file(save_path) == expected_sha256:
+                return True
+        except OSError:
+            pass
+        try:
+            os.remove(save_path)
+        except OSError:
+            pass
+        if status_callback:
+            status_callback("SHA256 mismatch, removed")
+        return False
+    
+    def download_files_parallel(self, files, save_dir, max_workers=BATCH_WORKERS,
+                                progress_callback=None, status_callback=None, make_dirs=True):
+        """
+        并行下载多个文件，所有线程共享同一个 session 连接池
+        files: [(relative_path, download_url, file_size), ...]
+        make_dirs: 父目录已由调用方统一创建时传 False
+        返回: (success_count, fail_count)
+        """
+        progress = None
+        if progress_callback:
+            progress = _BatchProgress(sum(size for _, _, size in files), progress_callback)
+        
+        def work(path, url, size):
+            if self._cancel_event.is_set():
+                return False
+            name = path.rpartition('/')[2]  # 仓库内路径总是用 '/' 分隔
+            save_path = os.path.join(save_dir, path)
+            file_status = partial(_prefix_status, status_callback, name) if status_callback else None
+            ok = self.download_file(
+                url, save_path,
+                progress_callback=partial(progress.update, path) if progress else None,
+                status_callback=file_status,
+                expected_size=size,
+                make_dirs=make_dirs
+            )
+            # LFS 文件下载完成后校验 SHA256
+            if ok and url in self.lfs_sha256:
+                ok = self.verify_file(save_path, self.lfs_sha256[url], file_status)
+            return ok
+        
+        # 大文件占用单独的线程依次下载，小文件不必排在大文件后面
+        large_files = [f for f in files if f[2] > LARGE_FILE_SIZE]
+        small_files = [f for f in files if f[2] <= LARGE_FILE_SIZE]
+        
+        success_count = 0
+        fail_count = 0
+        with ThreadPoolExecutor(max_workers=1) as large_pool, \
+                ThreadPoolExecutor(max_workers=max_workers) as small_pool:
+            futures = [large_pool.submit(work, *f) for f in large_files]
+            futures += [small_pool.submit(work, *f) for f in small_files]
+            for future in as_completed(futures):
+                try:
+                    ok = future.result()
+                except Exception:
+                    ok = False
+                if ok:
+                    success_count += 1
+                else:
+                    fail_count += 1
+        
+        return success_count, fail_count
+    
+    def iter_repo_files(self, username, model, branch='main', subpath=''):
+        """
+        逐页获取仓库文件列表，产出 (relative_path, download_url, file_size)
+        大仓库的列表是分页返回的，通过响应头 Link: rel="next" 继续获取
+        """
+        api_url = f"https://hf-mirror.com/api/models/{username}/{model}/tree/{branch}"
+        if subpath:
+            api_url += f"/{subpath}"
+        
+        while api_url:
+            with self.session.get(api_url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                
+                # 流式解析，大仓库的列表不会整体载入内存
+                for item in _iter_json_array(response):
+                    if item['type'] == 'file':
+                        relative_path = item['path']
+                        file_size = item.get('size', 0)
+                        download_url = f"https://hf-mirror.com/{username}/{model}/resolve/{branch}/{relative_path}"
+                        lfs = item.get('lfs')
+                        if lfs and lfs.get('oid'):
+                            self.lfs_sha256[download_url] = lfs['oid']
+                        yield relative_path, download_url, file_size
+                
+                api_url = response.links.get('next', {}).get('url')
+    
     def get_repo_files(self, username, model, branch='main', subpath=''):
         """获取仓库文件列表"""
         try:
-            api_url = f"https://hf-mirror.com/api/models/{username}/{model}/tree/{branch}"
-            if subpath:
-                api_url += f"/{subpath}"
-            
-            response = self.session.get(api_url, timeout=30)
-            if response.status_code != 200:
-                return None
-            
-            files_info = []
-            data = response.json()
-            
-            for item in data:
-                if item['type'] == 'file':
-                    relative_path = item['path']
-                    file_size = item.get('size', 0)
-                    download_url = f"https://hf-mirror.com/{username}/{model}/resolve/{branch}/{relative_path}"
-                    files_info.append((relative_path, download_url, file_size))
-            
-            return files_info
-        except:
+            return list(self.iter_repo_files(username, model, branch, subpath))
+        except Exception:
             return None
 
 
+class FileSelectionRow(RecycleDataViewBehavior, BoxLayout):
+    """
+    文件选择列表中的一行。由 RecycleView 复用，只创建可见的行
+    勾选状态保存在应用的 file_active 字节数组中（按行号索引），行被复用时从中恢复
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(size_hint_y=None, height=FILE_ROW_HEIGHT, spacing=5, **kwargs)
+        self.index = 0
+        self.app = App.get_running_app()
+        # 文字区域大小直接按弹窗宽度算好（弹窗占屏宽 95%，信息区占行宽 90%，减去边距）
+        # 行高固定，无需绑定 size 在每次布局时更新 text_size
+        text_width = Window.width * 0.95 * 0.9 - 40
+        
+        # 复选框
+        self.checkbox = CheckBox(size_hint_x=0.1)
+        self.checkbox.bind(active=self.on_checkbox_active)
+        self.add_widget(self.checkbox)
+        
+        # 使用垂直布局显示文件名和大小
+        info_layout = BoxLayout(orientation='vertical', size_hint_x=0.9)
+        
+        # 文件名 Label
+        self.name_label = Label(
+            halign='left',
+            valign='bottom',
+            color=(1, 1, 1, 1),
+            font_size='12sp',
+            size_hint_y=0.6,
+            text_size=(text_width, self.height * 0.6),
+            shorten=True,
+            shorten_from='right'
+        )
+        info_layout.add_widget(self.name_label)
+        
+        # 大小 Label
+        self.size_label = Label(
+            halign='left',
+            valign='top',
+            color=(0.7, 0.7, 0.7, 1),
+            font_size='11sp',
+            size_hint_y=0.4,
+            text_size=(text_width, self.height * 0.4)
+        )
+        info_layout.add_widget(self.size_label)
+        
+        self.add_widget(info_layout)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """行被复用显示另一条数据时调用（不调用父类：数据中的键不是控件属性）"""
+        self.index = index
+        self.name_label.text = data['name']
+        self.size_label.text = data['size_str']
+        self.checkbox.active = bool(self.app.file_active[index])
+    
+    def on_checkbox_active(self, instance, value):
+        if self.index < len(self.app.file_active):
+            self.app.file_active[self.index] = value
+
+
 class HFDownloaderApp(App):
     """移动端下载器应用主类"""
     
@@ -296,14 +1114,22 @@ class HFDownloaderApp(App):
         super().__init__(**kwargs)
         self.wake_lock = None
         self.window_flags_set = False
-        self.file_checkboxes = []
+        self.file_entries = []  # 文件选择列表数据：path/url/file_size 等
+        self.file_active = bytearray()  # 文件选择列表的勾选状态，每个文件一个字节
+        self.file_size_strs = {}  # 列表中各文件格式化好的大小 {path: '1.23 MB'}，日志中复用
+        self.file_rv = None
+        self.batch_workers = BATCH_WORKERS  # 批量下载并行数，可在文件选择界面调整
         self.files_data = []
-        self.file_selection_popup = None
+        self.file_selection_popup = None  # 文件选择弹窗，首次使用时创建，之后复用
+        self._file_header_label = None
+        self._popup = None  # show_popup 复用的提示弹窗
+        self._popup_label = None
         self.is_paused = False
         self.notification_id = 1001
         self.channel_id = 'hf_download_channel'
         self.state_file = None  # 状态保存文件路径
         self.pending_files = []  # 待下载文件列表
+        self.pending_url = ''  # 待下载文件所属的 URL
         self.current_save_dir = ''
     
     def build(self):
@@ -312,6 +1138,13 @@ class HFDownloaderApp(App):
         self.download_thread = None
         self.is_downloading = False
         self.log_label = None  # 先初始化为 None
+        # 下载线程只写入最新进度，主线程定时读取并刷新界面
+        self._ui_lock = threading.Lock()
+        self._ui_state = None
+        self._pump_event = None  # 下载期间才运行的界面刷新定时器
+        self._log_buf = deque()  # 下载线程产生的日志，由刷新定时器批量写入界面
+        self._total_size = None  # 缓存已格式化的总大小，总大小不变时不重复格式化
+        self._total_size_str = ''
         
         # 主布局
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -431,11 +1264,15 @@ class HFDownloaderApp(App):
         """初始化 Android 特性"""
         self.acquire_wake_lock()
         self.log_message('Ready')
+        # 检查上次未完成的批量下载
+        self.init_state_file()
+        self.check_pending_downloads()
     
-    def init_state_file(self):
-        """初始化状态文件路径"""
+    def init_state_file(self, save_dir=None):
+        """初始化状态文件路径（默认使用界面中的保存路径）"""
         try:
-            save_dir = self.path_input.text.strip() if self.path_input else ''
+            if save_dir is None:
+                save_dir = self.path_input.text.strip() if self.path_input else ''
             if save_dir:
                 os.makedirs(save_dir, exist_ok=True)
                 self.state_file = os.path.join(save_dir, '.hf_download_state.json')
@@ -447,10 +1284,13 @@ class HFDownloaderApp(App):
         if not self.state_file:
             return
         try:
+            hashes = self.downloader.lfs_sha256
             state = {
                 'files': files,
                 'save_dir': save_dir,
-                'url': self.url_input.text.strip() if self.url_input else ''
+                'url': self.url_input.text.strip() if self.url_input else '',
+                # LFS 文件的 SHA256，续传时不重新获取列表也能校验
+                'sha256': {url: hashes[url] for _, url, _ in files if url in hashes}
             }
             with open(self.state_file, 'w', encoding='utf-8') as f:
                 json.dump(state, f)
@@ -476,7 +1316,11 @@ class HFDownloaderApp(App):
             pass
     
     def check_pending_downloads(self):
-        """检查是否有未完成的下载"""
+        """检查是否有未完成的下载（在后台线程中进行，可能需要联网查询文件大小）"""
+        threading.Thread(target=self._check_pending_worker, daemon=True).start()
+    
+    def _check_pending_worker(self):
+        """后台检查未完成的下载，结果交给主线程显示"""
         try:
             state = self.load_download_state()
             if not state or not state.get('files'):
@@ -488,30 +1332,50 @@ class HFDownloaderApp(App):
             
             if not save_dir:
                 return
+            self.downloader.lfs_sha256.update(state.get('sha256', {}))
             
+            # 直接使用状态文件中缓存的大小（来自仓库文件列表），不逐个发送 HEAD
+            # 本地文件大小按目录 scandir 一次获取，不逐个 stat
+            local_sizes = _index_existing(save_dir, [f[0] for f in files])
             pending = []
+            unknown = []  # 列表中没有大小的已有文件，需要查询
             for f in files:
                 try:
                     path, file_url, size = f
-                    save_path = os.path.join(save_dir, path)
-                    if os.path.exists(save_path):
-                        if os.path.getsize(save_path) < size:
-                            pending.append(f)
-                    else:
+                    if path not in local_sizes or path + PART_SUFFIX in local_sizes:
+                        pending.append(f)
+                    elif not size:
+                        unknown.append(f)
+                    elif local_sizes[path] != size:  # 比列表中大的文件也不可信，交给 download_file 重新下载
                         pending.append(f)
                 except Exception:
                     continue
             
+            if unknown:
+                # 并发发送 HEAD，总耗时取决于最慢的一个请求而不是所有请求之和
+                with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+                    sizes = pool.map(self.downloader.get_file_size, [f[1] for f in unknown])
+                    for f, size in zip(unknown, sizes):
+                        if not size or local_sizes[f[0]] != size:
+                            pending.append(f)
+            
             if pending:
-                self.pending_files = pending
-                self.current_save_dir = save_dir
-                if url and self.url_input:
-                    self.url_input.text = url
-                self.log_message(f'Found {len(pending)} pending')
-                self.log_message('Click Start to resume')
+                Clock.schedule_once(lambda dt: self._show_pending(pending, url, save_dir), 0)
         except Exception:
             pass
     
+    def _show_pending(self, pending, url, save_dir):
+        """记录待续传的文件并提示用户（主线程）"""
+        if self.is_downloading:
+            return  # 检查期间用户已开始了新的下载
+        self.pending_files = pending
+        self.pending_url = url
+        self.current_save_dir = save_dir
+        if url and self.url_input:
+            self.url_input.text = url
+        self.log_message(f'Found {len(pending)} pending')
+        self.log_message('Click Start to resume')
+    
     def create_notification_channel(self):
         """创建通知通道"""
         pass  # 简化版本不使用通知
@@ -564,14 +1428,14 @@ class HFDownloaderApp(App):
         if self.is_paused:
             # 继续下载
             self.is_paused = False
-            self.downloader.pause_flag = False
+            self.downloader.resume_download()
             self.pause_btn.text = 'Pause'
             self.pause_btn.background_color = (1, 0.6, 0, 1)
             self.log_message('>> Download resumed')
         else:
             # 暂停下载
             self.is_paused = True
-            self.downloader.pause_flag = True
+            self.downloader.pause_download()
             self.pause_btn.text = 'Resume'
             self.pause_btn.background_color = (0.2, 0.8, 0.2, 1)
             self.log_message('|| Download paused')
@@ -580,6 +1444,7 @@ class HFDownloaderApp(App):
         """获取唤醒锁，防止CPU睡眠和后台杀死（兼容 ColorOS 15）"""
         if platform == 'android' and not self.wake_lock:
             try:
+                _load_android_classes()
                 activity = PythonActivity.mActivity
                 power_manager = cast(PowerManager, activity.getSystemService(Context.POWER_SERVICE))
                 
@@ -612,6 +1477,7 @@ class HFDownloaderApp(App):
         """保持屏幕常亮，防止黑屏"""
         if platform == 'android' and not self.window_flags_set:
             try:
+                _load_android_classes()
                 activity = PythonActivity.mActivity
                 window = activity.getWindow()
                 
@@ -626,6 +1492,7 @@ class HFDownloaderApp(App):
         """清除屏幕常亮设置"""
         if platform == 'android' and self.window_flags_set:
             try:
+                _load_android_classes()
                 activity = PythonActivity.mActivity
                 window = activity.getWindow()
                 # 直接使用常量值 FLAG_KEEP_SCREEN_ON = 128
@@ -654,6 +1521,48 @@ class HFDownloaderApp(App):
         self.log_label.text = f"{current}\n{message}" if current else message
         self.log_scroll.scroll_y = 0
     
+    def post_log(self, message):
+        """添加日志（可在任意线程调用）：先放入缓冲，由界面刷新定时器一次性写入"""
+        self._log_buf.append(message)
+        if self._pump_event is None:
+            Clock.schedule_once(lambda dt: self._flush_logs(), 0)
+    
+    def _flush_logs(self):
+        """把缓冲中的日志一次写入日志 Label"""
+        if not self._log_buf:
+            return
+        lines = []
+        while self._log_buf:
+            lines.append(self._log_buf.popleft())
+        self.log_message('\n'.join(lines))
+    
+    def report_progress(self, downloaded, total, speed=0):
+        """进度回调（下载线程调用）：只记录最新状态，不直接操作界面"""
+        with self._ui_lock:
+            self._ui_state = (downloaded, total, speed)
+    
+    def _pump_ui(self, dt):
+        """主线程定时把最新进度和日志刷新到界面（百分比在此计算，每次刷新只算一次）"""
+        self._flush_logs()
+        with self._ui_lock:
+            state, self._ui_state = self._ui_state, None
+        if state is not None:
+            downloaded, total, speed = state
+            percentage = min(100.0, downloaded / total * 100) if total > 0 else 0
+            self.update_progress(percentage, downloaded, total, speed)
+    
+    def _start_ui_pump(self):
+        """开始下载时启动界面刷新定时器，空闲时不唤醒主线程"""
+        if self._pump_event is None:
+            self._pump_event = Clock.schedule_interval(self._pump_ui, 1 / 15.)
+    
+    def _stop_ui_pump(self):
+        """停止界面刷新定时器，并刷新最后一次进度"""
+        if self._pump_event is not None:
+            self._pump_event.cancel()
+            self._pump_event = None
+        self._pump_ui(0)
+    
     def update_progress(self, percentage, downloaded, total, speed=0):
         """更新进度"""
         self.progress_bar.value = percentage
@@ -664,7 +1573,11 @@ class HFDownloaderApp(App):
         else:
             speed_str = ""
         
-        self.progress_label.text = f"{self.downloader.format_size(downloaded)} / {self.downloader.format_size(total)} ({percentage:.1f}%){speed_str}"
+        if total != self._total_size:
+            self._total_size = total
+            self._total_size_str = self.downloader.format_size(total)
+        
+        self.progress_label.text = f"{self.downloader.format_size(downloaded)} / {self._total_size_str} ({percentage:.1f}%){speed_str}"
     
     def start_download(self, instance):
         """开始下载"""
@@ -706,8 +1619,22 @@ class HFDownloaderApp(App):
             self.is_paused = False
             self.downloader.pause_flag = False
             self.downloader.cancel_flag = False
+            self._start_ui_pump()
+            
+            if is_directory and self.pending_files and not self._is_pending_repo(repo_info, save_dir):
+                # 换了仓库或目录：旧的待下载列表不再适用，重新获取新仓库的列表
+                self.pending_files = []
+                self.pending_url = ''
+                self.clear_download_state()
             
-            if is_directory:
+            if is_directory and self.pending_files:
+                # 续传上次未完成的文件：大小已缓存在状态文件中，无需重新获取列表
+                files, self.pending_files = self.pending_files, []
+                self.log_message(f'Resuming {len(files)} pending files...')
+                thread = threading.Thread(target=self._download_selected_files,
+                                          args=(files, save_dir), daemon=True)
+                thread.start()
+            elif is_directory:
                 self.log_message('Batch mode: Getting file list...')
                 if repo_info:
                     self.log_message(f"Model: {repo_info.get('username', '')}/{repo_info.get('model', '')}")
@@ -726,6 +1653,15 @@ class HFDownloaderApp(App):
             self.log_message(f'Error: {str(e)[:50]}')
             self.download_btn.disabled = False
     
+    def _is_pending_repo(self, repo_info, save_dir):
+        """待下载文件是否属于同一仓库（用户名/模型/分支/子目录）和同一保存目录"""
+        if self.current_save_dir != save_dir or not self.pending_url:
+            return False
+        try:
+            return self.downloader.parse_hf_url(self.pending_url)[3] == repo_info
+        except Exception:
+            return False
+    
     def _fetch_files_and_show_selection(self, repo_info, save_dir):
         """获取文件列表并显示选择界面"""
         try:
@@ -737,7 +1673,7 @@ class HFDownloaderApp(App):
             )
             
             if not files:
-                Clock.schedule_once(lambda dt: self.log_message('Failed to get file list'), 0)
+                self.post_log('Failed to get file list')
                 Clock.schedule_once(lambda dt: self._download_finished(False), 0)
                 return
             
@@ -745,19 +1681,45 @@ class HFDownloaderApp(App):
             self.current_save_dir = save_dir
             Clock.schedule_once(lambda dt: self._show_file_selection(files), 0)
         except Exception as e:
-            Clock.schedule_once(lambda dt: self.log_message(f'Error: {str(e)[:30]}'), 0)
+            self.post_log(f'Error: {str(e)[:30]}')
             Clock.schedule_once(lambda dt: self._download_finished(False), 0)
     
     def _show_file_selection(self, files):
         """显示文件选择界面"""
-        self.file_checkboxes = []
+        # 列表数据只是字典，界面行由 RecycleView 按需创建
+        self.file_size_strs = {path: self.downloader.format_size(size) for path, _, size in files}
+        self.file_entries = [
+            {'path': path, 'url': url, 'file_size': size,
+             'name': path.rpartition('/')[2], 'size_str': f'[{self.file_size_strs[path]}]'}
+            for path, url, size in files
+        ]
+        self.file_active = bytearray(b'\x01') * len(files)
+        
+        # 弹窗只创建一次，之后只更新标题和列表数据
+        if self.file_selection_popup is None:
+            self._build_file_selection_popup()
+        self._file_header_label.text = f'Found {len(files)} files:'
+        self.file_rv.data = self.file_entries
+        self.file_rv.scroll_y = 1
+        self.file_selection_popup.open()
         
+        # 列表已获取完毕，等待用户选择期间没有下载，停止界面刷新定时器
+        self.is_downloading = False
+        self._stop_ui_pump()
+        
+        # 恢复按钮状态
+        self.download_btn.disabled = False
+        self.cancel_btn.disabled = True
+    
+    def _build_file_selection_popup(self):
+        """创建文件选择弹窗"""
         # 创建内容布局
         content = BoxLayout(orientation='vertical', spacing=5, padding=10)
         
         # 标题
         header = BoxLayout(size_hint_y=None, height=40)
-        header.add_widget(Label(text=f'Found {len(files)} files:', color=(1, 1, 1, 1)))
+        self._file_header_label = Label(color=(1, 1, 1, 1))
+        header.add_widget(self._file_header_label)
         content.add_widget(header)
         
         # 全选/取消全选按钮
@@ -768,58 +1730,29 @@ class HFDownloaderApp(App):
         deselect_all_btn.bind(on_press=lambda x: self._toggle_all_files(False))
         btn_layout.add_widget(select_all_btn)
         btn_layout.add_widget(deselect_all_btn)
-        content.add_widget(btn_layout)
         
-        # 文件列表（可滚动）
-        scroll = ScrollView(size_hint_y=0.65)
-        file_grid = GridLayout(cols=1, spacing=8, size_hint_y=None, padding=[5, 5])
-        file_grid.bind(minimum_height=file_grid.setter('height'))
-        
-        for path, url, size in files:
-            # 每个文件一行 - 增加行高
-            row = BoxLayout(size_hint_y=None, height=80, spacing=5)
-            
-            # 复选框
-            cb = CheckBox(active=True, size_hint_x=0.1)
-            self.file_checkboxes.append((cb, path, url, size))
-            row.add_widget(cb)
-            
-            # 文件名和大小 - 分开显示
-            filename = os.path.basename(path)
-            size_str = self.downloader.format_size(size)
-            
-            # 使用垂直布局显示文件名和大小
-            info_layout = BoxLayout(orientation='vertical', size_hint_x=0.9)
-            
-            # 文件名 Label
-            name_label = Label(
-                text=filename,
-                halign='left',
-                valign='bottom',
-                color=(1, 1, 1, 1),
-                font_size='12sp',
-                size_hint_y=0.6
-            )
-            name_label.bind(size=name_label.setter('text_size'))
-            info_layout.add_widget(name_label)
-            
-            # 大小 Label
-            size_label = Label(
-                text=f'[{size_str}]',
-                halign='left',
-                valign='top',
-                color=(0.7, 0.7, 0.7, 1),
-                font_size='11sp',
-                size_hint_y=0.4
-            )
-            size_label.bind(size=size_label.setter('text_size'))
-            info_layout.add_widget(size_label)
-            
-            row.add_widget(info_layout)
-            file_grid.add_widget(row)
+        # 并行下载数
+        workers_spinner = Spinner(text=str(self.batch_workers), values=BATCH_WORKER_CHOICES,
+                                  size_hint_x=0.5, font_size='14sp')
+        workers_spinner.bind(text=lambda spinner, text: setattr(self, 'batch_workers', int(text)))
+        btn_layout.add_widget(Label(text='Threads:', size_hint_x=0.5, font_size='14sp', color=(1, 1, 1, 1)))
+        btn_layout.add_widget(workers_spinner)
+        content.add_widget(btn_layout)
         
-        scroll.add_widget(file_grid)
-        content.add_widget(scroll)
+        # 文件列表（可滚动，只创建可见的行）
+        self.file_rv = RecycleView(size_hint_y=0.65)
+        self.file_rv.viewclass = FileSelectionRow
+        file_layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, FILE_ROW_HEIGHT),  # 每个文件一行，固定行高
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=8,
+            padding=[5, 5]
+        )
+        file_layout.bind(minimum_height=file_layout.setter('height'))
+        self.file_rv.add_widget(file_layout)
+        content.add_widget(self.file_rv)
         
         # 下载按钮
         download_btn = Button(
@@ -832,27 +1765,29 @@ class HFDownloaderApp(App):
         download_btn.bind(on_press=self._start_selected_download)
         content.add_widget(download_btn)
         
-        # 显示弹窗
         self.file_selection_popup = Popup(
             title='Select Files', 
             content=content,
             size_hint=(0.95, 0.9)
         )
-        self.file_selection_popup.open()
-        
-        # 恢复按钮状态
-        self.download_btn.disabled = False
-        self.cancel_btn.disabled = True
+        # 关闭弹窗但没有开始下载时，确保定时器不再运行
+        self.file_selection_popup.bind(on_dismiss=self._on_file_selection_dismiss)
+    
+    def _on_file_selection_dismiss(self, popup):
+        if not self.is_downloading:
+            self._stop_ui_pump()
     
     def _toggle_all_files(self, select):
-        """全选/取消全选"""
-        for cb, path, url, size in self.file_checkboxes:
-            cb.active = select
+        """全选/取消全选：一次填充整个勾选数组，只有可见的行需要刷新"""
+        self.file_active[:] = (b'\x01' if select else b'\x00') * len(self.file_active)
+        if self.file_rv:
+            self.file_rv.refresh_from_data()
     
     def _start_selected_download(self, instance):
         """开始下载选中的文件"""
         try:
-            selected_files = [(path, url, size) for cb, path, url, size in self.file_checkboxes if cb.active]
+            selected_files = [(e['path'], e['url'], e['file_size'])
+                              for e, active in zip(self.file_entries, self.file_active) if active]
             
             if not selected_files:
                 self.show_popup('Notice', 'Please select at least one file')
@@ -863,6 +1798,11 @@ class HFDownloaderApp(App):
             
             self.log_message(f'\nDownloading {len(selected_files)} files...')
             
+            # 记录本次批量下载（文件列表中已含大小），中断后下次启动可直接续传
+            self.pending_files = []
+            self.init_state_file(self.current_save_dir)
+            self.save_download_state(selected_files, self.current_save_dir)
+            
             # 重置状态
             self.download_btn.disabled = True
             self.cancel_btn.disabled = False
@@ -871,6 +1811,7 @@ class HFDownloaderApp(App):
             self.is_paused = False
             self.downloader.pause_flag = False
             self.downloader.cancel_flag = False
+            self._start_ui_pump()
             
             thread = threading.Thread(target=self._download_selected_files, 
                                       args=(selected_files, self.current_save_dir), daemon=True)
@@ -883,72 +1824,92 @@ class HFDownloaderApp(App):
         total = len(files)
         success_count = 0
         fail_count = 0
+        pending = []  # 需要下载的文件，稍后并行下载
         
-        for i, (path, url, size) in enumerate(files, 1):
+        # 每个文件的父目录（仓库中的相对路径）只计算一次
+        parent_dirs = [p.rpartition('/')[0] for p, _, _ in files]
+        
+        # 预先创建所有父目录，每个目录只创建一次
+        # 从最深的目录开始，makedirs 会顺带创建上级目录，之后遇到的上级目录直接跳过
+        failed_dirs = set()
+        created_dirs = set()
+        for rel_dir in sorted(set(parent_dirs), key=len, reverse=True):
+            if rel_dir in created_dirs:
+                continue
+            try:
+                os.makedirs(os.path.join(save_dir, rel_dir), exist_ok=True)
+            except Exception as e:
+                failed_dirs.add(rel_dir)
+                self.post_log(f'Path error: {e}')
+                continue
+            while rel_dir:
+                created_dirs.add(rel_dir)
+                rel_dir = rel_dir.rpartition('/')[0]
+        
+        # 一次扫描得到所有本地文件大小，循环中不再逐个 stat
+        local_sizes = _index_existing(save_dir, [p for p, _, _ in files])
+        
+        for i, ((path, url, size), rel_dir) in enumerate(zip(files, parent_dirs), 1):
             if not self.is_downloading:
                 break
             
-            filename = os.path.basename(path)
-            try:
-                save_path = os.path.join(save_dir, path)
-                os.makedirs(os.path.dirname(save_path) if os.path.dirname(save_path) else save_dir, exist_ok=True)
-            except Exception as e:
-                Clock.schedule_once(lambda dt: self.log_message(f'Path error: {e}'), 0)
+            if rel_dir in failed_dirs:
                 fail_count += 1
                 continue
             
             # 检查是否有旧文件（断点续传）
-            existing_size = 0
-            if os.path.exists(save_path):
-                existing_size = os.path.getsize(save_path)
+            existing_size = local_sizes.get(path, 0)
             
             if existing_size > 0 and existing_size < size:
-                Clock.schedule_once(lambda dt, p=path, e=existing_size, s=size, idx=i, t=total: 
-                    self.log_message(f'\n[{idx}/{t}] {os.path.basename(p)}\n  -> RESUME: {self.downloader.format_size(e)}/{self.downloader.format_size(s)}'), 0)
-            elif existing_size >= size and size > 0:
-                Clock.schedule_once(lambda dt, p=path, idx=i, t=total: 
-                    self.log_message(f'\n[{idx}/{t}] {os.path.basename(p)} (done)'), 0)
+                self._log_file_event(path, i, total, 'resume', existing_size, size)
+            elif existing_size == size and size > 0 and path + PART_SUFFIX not in local_sizes:
+                self._log_file_event(path, i, total, 'done')
                 success_count += 1
                 continue
             else:
-                Clock.schedule_once(lambda dt, p=path, idx=i, t=total: 
-                    self.log_message(f'\n[{idx}/{t}] {os.path.basename(p)}'), 0)
+                self._log_file_event(path, i, total, 'new')
             
-            result = self.downloader.download_file(
-                url, save_path,
-                progress_callback=self.update_progress,
-                status_callback=self.log_message
+            pending.append((path, url, size))
+        
+        if pending and self.is_downloading:
+            ok, failed = self.downloader.download_files_parallel(
+                pending, save_dir,
+                max_workers=self.batch_workers,
+                progress_callback=self.report_progress,
+                status_callback=self.post_log,
+                make_dirs=False
             )
-            
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-                # 网络失败时停止继续
-                if not self.is_downloading:
-                    break
+            success_count += ok
+            fail_count += failed
         
         # 下载完成
         all_success = (fail_count == 0 and success_count > 0)
-        Clock.schedule_once(lambda dt, s=success_count, f=fail_count: 
-            self.log_message(f'\n=== Done: {s} success, {f} failed ==='), 0)
+        if all_success:
+            self.clear_download_state()
+        self.post_log(f'\n=== Done: {success_count} success, {fail_count} failed ===')
         Clock.schedule_once(lambda dt, ok=all_success: self._download_finished(ok), 0)
 
+    def _log_file_event(self, path, idx, total, kind, existing=0, size=0):
+        """记录批量下载中单个文件的状态，kind: 'new' / 'resume' / 'done'"""
+        message = f'\n[{idx}/{total}] {path.rpartition("/")[2]}'
+        if kind == 'resume':
+            # 总大小复用文件列表中已格式化的字符串（续传上次的任务时没有列表，才重新格式化）
+            size_str = self.file_size_strs.get(path) or self.downloader.format_size(size)
+            message += f'\n  -> RESUME: {self.downloader.format_size(existing)}/{size_str}'
+        elif kind == 'done':
+            message += ' (done)'
+        self.post_log(message)
+    
     def _single_download(self, url, save_path):
-        """单文件下载工作线程"""
-        # 检查断点续传
-        filename = os.path.basename(save_path)
-        if os.path.exists(save_path):
-            existing_size = os.path.getsize(save_path)
-            total_size = self.downloader.get_file_size(url)
-            if existing_size > 0 and existing_size < total_size:
-                Clock.schedule_once(lambda dt: 
-                    self.log_message(f'RESUME: {self.downloader.format_size(existing_size)}/{self.downloader.format_size(total_size)}'), 0)
-        
+        """
+        单文件下载工作线程
+        单文件 URL 没有列表元数据，不单独发送 HEAD：
+        download_file 会报告续传位置并从 GET 响应头得到总大小
+        """
         success = self.downloader.download_file(
             url, save_path,
-            progress_callback=self.update_progress,
-            status_callback=self.log_message
+            progress_callback=self.report_progress,
+            status_callback=self.post_log
         )
         Clock.schedule_once(lambda dt: self._download_finished(success), 0)
     
@@ -962,6 +1923,7 @@ class HFDownloaderApp(App):
             self.is_paused = False
             self.downloader.cancel_flag = False
             self.downloader.pause_flag = False
+            self._stop_ui_pump()
             
             self.cancel_notification()
             
@@ -974,7 +1936,7 @@ class HFDownloaderApp(App):
     
     def cancel_download(self, instance):
         """取消下载"""
-        self.downloader.cancel_flag = True
+        self.downloader.cancel_download()
         self.is_downloading = False
         self.is_paused = False
         self.pause_btn.disabled = True
@@ -982,14 +1944,22 @@ class HFDownloaderApp(App):
         self.log_message('Cancelling...')
     
     def show_popup(self, title, message):
-        """显示弹窗"""
-        popup = Popup(title=title, content=Label(text=message),
-                     size_hint=(0.8, 0.3))
-        popup.open()
+        """显示弹窗（复用同一个弹窗，只更新标题和内容）"""
+        if self._popup is None:
+            self._popup_label = Label()
+            self._popup = Popup(content=self._popup_label, size_hint=(0.8, 0.3))
+        self._popup.title = title
+        self._popup_label.text = message
+        self._popup.open()
 
 
     def on_stop(self):
         """应用关闭时释放资源"""
+        # 先让下载线程尽快退出，否则解释器退出时会等待线程池中的任务完成
+        self.downloader.shutdown()
+        if self._pump_event is not None:
+            self._pump_event.cancel()
+            self._pump_event = None
         self.release_wake_lock()
         self.clear_screen_on()
         return True